@@ -2,18 +2,33 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 import openai
 import os
+import math
+import gzip
+import hashlib
+import ipaddress
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import wraps
 import logging
 import re
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import json
 import requests
 from bs4 import BeautifulSoup
 from deep_translator import GoogleTranslator
 import langdetect
 
+# ضغط brotli اختياري (يُستخدم gzip إذا لم تكن المكتبة مثبتة)
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 # استيراد الـ crawler
 from crawler import SaudiGazetteCrawler
+from rate_limiter import TokenBucket, ClientRateLimiter, ConcurrencyLimiter, BudgetExceeded, RequestTooLarge
 
 # إعداد الـ logging
 logging.basicConfig(level=logging.INFO)
@@ -26,8 +41,55 @@ CORS(app)  # للسماح بطلبات من Frontend
 # إعداد OpenAI (تحتاج تضع API key في متغير البيئة)
 openai.api_key = os.getenv('OPENAI_API_KEY')
 
-# إنشاء crawler instance
-crawler = SaudiGazetteCrawler()
+# ترتيب مراحل التلخيص والترجمة
+# translate_first: ترجمة المقال كاملاً ثم تلخيصه (السلوك الأصلي)
+# summarize_first: التلخيص بلغة المصدر ثم ترجمة الملخص فقط (أقل حجماً في الترجمة)
+PIPELINE_TRANSLATE_FIRST = 'translate_first'
+PIPELINE_SUMMARIZE_FIRST = 'summarize_first'
+PIPELINE_MODES = (PIPELINE_TRANSLATE_FIRST, PIPELINE_SUMMARIZE_FIRST)
+DEFAULT_PIPELINE = os.getenv('SUMMARY_PIPELINE', PIPELINE_TRANSLATE_FIRST)
+if DEFAULT_PIPELINE not in PIPELINE_MODES:
+    logger.warning(f"قيمة SUMMARY_PIPELINE غير معروفة: {DEFAULT_PIPELINE}، سيتم استخدام {PIPELINE_TRANSLATE_FIRST}")
+    DEFAULT_PIPELINE = PIPELINE_TRANSLATE_FIRST
+
+# تلخيص مقالات الصفحة الرئيسية مسبقاً عند تحديث الـ crawler (اختياري)
+PRECOMPUTE_SUMMARIES = os.getenv('PRECOMPUTE_SUMMARIES', 'false').lower() == 'true'
+PRECOMPUTE_WORKERS = int(os.getenv('PRECOMPUTE_WORKERS', '2'))
+# إعادة المحاولة للأخطاء المؤقتة فقط (تجاوز الميزانية أو خطأ غير متوقع) بحد أقصى وتأخير متضاعف
+PRECOMPUTE_MAX_ATTEMPTS = int(os.getenv('PRECOMPUTE_MAX_ATTEMPTS', '3'))
+PRECOMPUTE_RETRY_BACKOFF = float(os.getenv('PRECOMPUTE_RETRY_BACKOFF', '60'))
+# نسبة من ميزانيات OpenAI والترجمة محجوزة لطلبات المستخدمين، لا يبدأ التلخيص المسبق تحتها
+PRECOMPUTE_BUDGET_RESERVE = float(os.getenv('PRECOMPUTE_BUDGET_RESERVE', '0.5'))
+
+# ضغط الاستجابات والتخزين المؤقت (ETag / Cache-Control)
+ARTICLES_MAX_AGE = int(os.getenv('ARTICLES_MAX_AGE', '60'))
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '500'))
+
+# التحكم في القبول (Admission Control)
+# حدود لكل عميل على الـ routes، وحد أعلى للتلخيص المتزامن، وميزانيات للخدمات الخارجية
+# القيمة 0 تعني بدون حد
+RATE_LIMIT_PER_MINUTE = int(os.getenv('RATE_LIMIT_PER_MINUTE', '60'))
+RATE_LIMIT_PER_HOUR = int(os.getenv('RATE_LIMIT_PER_HOUR', '1000'))
+SUMMARIZE_RATE_LIMIT_PER_MINUTE = int(os.getenv('SUMMARIZE_RATE_LIMIT_PER_MINUTE', '10'))
+SUMMARIZE_MAX_CONCURRENCY = int(os.getenv('SUMMARIZE_MAX_CONCURRENCY', '8'))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '0.5'))
+OPENAI_TOKENS_PER_MINUTE = int(os.getenv('OPENAI_TOKENS_PER_MINUTE', '40000'))
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '30'))
+TRANSLATE_CHARS_PER_MINUTE = int(os.getenv('TRANSLATE_CHARS_PER_MINUTE', '200000'))
+# الثقة في X-Real-IP / X-Forwarded-For فقط إذا جاء الطلب من proxy معروف (مثل Nginx)
+# TRUSTED_PROXIES: قائمة عناوين أو شبكات مفصولة بفواصل، مثلاً 172.16.0.0/12
+TRUST_PROXY_HEADERS = os.getenv('TRUST_PROXY_HEADERS', 'false').lower() == 'true'
+TRUSTED_PROXIES = [ipaddress.ip_network(proxy.strip(), strict=False)
+                   for proxy in os.getenv('TRUSTED_PROXIES', '').split(',') if proxy.strip()]
+
+articles_rate_limiter = ClientRateLimiter(RATE_LIMIT_PER_MINUTE, RATE_LIMIT_PER_HOUR)
+summarize_rate_limiter = ClientRateLimiter(SUMMARIZE_RATE_LIMIT_PER_MINUTE, RATE_LIMIT_PER_HOUR)
+summarize_concurrency = ConcurrencyLimiter(SUMMARIZE_MAX_CONCURRENCY, queue_timeout=ADMISSION_QUEUE_TIMEOUT)
+openai_budget = TokenBucket(OPENAI_TOKENS_PER_MINUTE)
+translation_budget = TokenBucket(TRANSLATE_CHARS_PER_MINUTE)
+
+# إنشاء crawler instance (يمكن توجيهه لخادم بديل عبر SAUDI_GAZETTE_URL لاختبارات الحمل)
+crawler = SaudiGazetteCrawler(base_url=os.getenv('SAUDI_GAZETTE_URL'))
 
 class ArticleFetcher:
     """خدمة جلب محتوى المقالات من الروابط"""
@@ -97,6 +159,17 @@ class TranslationService:
     def __init__(self):
         self.translator = GoogleTranslator(source='auto', target='ar')
         self.arabic_keywords = ['العربية', 'السعودية', 'الخليج', 'الشرق الأوسط', 'مكة', 'الرياض', 'جدة']
+        # تحميل ملفات langdetect مسبقاً لأن التحميل الكسول غير آمن بين الـ threads
+        langdetect.detector_factory.init_factory()
+        # عنوان بديل لخدمة Google Translate (يستخدم في اختبارات الحمل مع خادم محلي)
+        self.base_url = os.getenv('GOOGLE_TRANSLATE_URL')
+    
+    def _make_translator(self, source: str) -> GoogleTranslator:
+        """إنشاء translator مع توجيهه للعنوان البديل إن وجد"""
+        translator = GoogleTranslator(source=source, target='ar')
+        if self.base_url:
+            translator._base_url = self.base_url
+        return translator
     
     def detect_language(self, text: str) -> str:
         """اكتشاف لغة النص"""
@@ -128,6 +201,11 @@ class TranslationService:
                 logger.info("النص عربي أصلاً، لا حاجة للترجمة")
                 return text, False
             
+            # فحص ميزانية الترجمة قبل إرسال أي جزء من النص
+            allowed, retry_after = translation_budget.try_acquire(len(text))
+            if not allowed:
+                raise BudgetExceeded("تم تجاوز حصة الترجمة المتاحة، يرجى المحاولة لاحقاً", retry_after)
+            
             logger.info(f"ترجمة النص من {detected_lang} إلى العربية...")
             
             # تقسيم النص إلى أجزاء صغيرة للترجمة
@@ -137,7 +215,7 @@ class TranslationService:
             for chunk in chunks:
                 try:
                     # إنشاء translator جديد لكل chunk
-                    translator = GoogleTranslator(source=detected_lang, target='ar')
+                    translator = self._make_translator(detected_lang)
                     result = translator.translate(chunk)
                     translated_chunks.append(result)
                 except Exception as e:
@@ -149,6 +227,8 @@ class TranslationService:
             logger.info("تم إكمال الترجمة بنجاح")
             return translated_text, True
             
+        except (BudgetExceeded, RequestTooLarge):
+            raise
         except Exception as e:
             logger.error(f"خطأ في الترجمة: {e}")
             return text, False
@@ -279,17 +359,110 @@ class AIService:
             logger.error(f"خطأ في استخراج محتوى المقال: {e}")
             return None
     
-    def summarize_to_arabic(self, text: str, is_article_data: bool = False) -> Dict[str, Any]:
+    def _estimate_openai_tokens(self, text: str) -> int:
+        """تقدير تقريبي لعدد tokens الطلب (المدخل + أقصى طول للمخرج)"""
+        return len(text) // 3 + 400
+    
+    def _summarize(self, text: str, in_source_language: bool = False) -> tuple[str, str]:
+        """
+        تلخيص النص باستخدام OpenAI مع الرجوع للتلخيص البسيط عند الفشل
+        
+        Args:
+            text: النص المراد تلخيصه
+            in_source_language: كتابة الملخص بلغة النص نفسها بدلاً من العربية (وضع summarize_first)
+        """
+        summary = None
+        method_used = "Unknown"
+        
+        use_openai = bool(openai.api_key and openai.api_key.strip())
+        
+        # عند نفاد حصة OpenAI (أو تجاوز الطلب سعتها) نستخدم التلخيص البسيط بدلاً من انتظار أخطاء 429
+        if use_openai:
+            try:
+                allowed = openai_budget.try_acquire(self._estimate_openai_tokens(text))[0]
+            except RequestTooLarge:
+                allowed = False
+            if not allowed:
+                logger.warning("تم تجاوز حصة OpenAI لهذه الدقيقة، استخدام التلخيص البسيط")
+                use_openai = False
+        
+        # المحاولة 1: OpenAI GPT
+        if use_openai:
+            try:
+                logger.info("محاولة التلخيص باستخدام OpenAI...")
+                
+                system_prompt = """أنت خبير في تلخيص النصوص الإخبارية باللغة العربية. 
+                مهمتك هي قراءة النص المعطى وكتابة ملخص شامل ودقيق باللغة العربية الفصحى.
+
+                متطلبات الملخص:
+                1. يجب أن يكون باللغة العربية الفصحى
+                2. يجب أن يغطي النقاط الرئيسية في النص
+                3. يجب أن يكون واضحاً ومفهوماً
+                4. يجب أن يتراوح طوله بين 150-300 كلمة
+                5. يجب أن يحافظ على المعنى الأساسي للنص الأصلي
+                6. تجنب التفاصيل الصغيرة والتركيز على الأهم
+                7. اكتب بأسلوب صحفي واضح ومباشر
+                8. استخدم جمل كاملة وتراكيب سليمة"""
+                
+                user_prompt = f"الرجاء تلخيص هذا النص باللغة العربية:\n\n{text}"
+                
+                # في وضع summarize_first يُكتب الملخص بلغة المصدر ثم يُترجم عبر خدمة الترجمة
+                if in_source_language:
+                    system_prompt = """You are an expert news summarizer.
+                    Read the given text and write a comprehensive, accurate summary
+                    in the same language the text is written in. Do not translate it.
+
+                    Summary requirements:
+                    1. Cover the main points of the text
+                    2. Be clear and easy to understand
+                    3. Be between 150 and 300 words long
+                    4. Preserve the core meaning of the original text
+                    5. Skip minor details and focus on what matters most
+                    6. Use a clear, direct journalistic style with complete sentences"""
+                    
+                    user_prompt = f"Summarize the following text in its original language:\n\n{text}"
+                
+                response = openai.chat.completions.create(
+                    model="gpt-4",
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    max_tokens=400,
+                    temperature=0.7,
+                    timeout=OPENAI_TIMEOUT
+                )
+                
+                summary = response.choices[0].message.content.strip()
+                method_used = "OpenAI GPT-4"
+                logger.info("تم التلخيص بنجاح باستخدام OpenAI")
+                
+            except Exception as e:
+                logger.error(f"فشل OpenAI: {e}")
+                summary = None
+        
+        # إذا لم يتوفر OpenAI أو فشل، استخدم التلخيص البسيط
+        if not summary:
+            logger.info("استخدام التلخيص البسيط...")
+            summary = self._generate_simple_summary(text)
+            method_used = "Simple Summary Algorithm"
+        
+        return summary, method_used
+    
+    def summarize_to_arabic(self, text: str, is_article_data: bool = False, pipeline: str = None) -> Dict[str, Any]:
         """
         تلخيص النص إلى العربية مع الترجمة التلقائية
         
         Args:
             text: النص المراد تلخيصه أو JSON string لبيانات المقال
             is_article_data: هل النص عبارة عن بيانات مقال
+            pipeline: ترتيب المعالجة (translate_first أو summarize_first)،
+                      الافتراضي من متغير البيئة SUMMARY_PIPELINE
             
         Returns:
             dict: يحتوي على الملخص بالعربية أو رسالة خطأ
         """
+        pipeline = pipeline or DEFAULT_PIPELINE
         try:
             # إذا كان النص عبارة عن بيانات مقال
             actual_text = text
@@ -312,68 +485,41 @@ class AIService:
             # تنظيف وفحص النص
             cleaned_text = self._clean_text(actual_text)
             
-            # الترجمة التلقائية إلى العربية إذا لزم الأمر
-            translated_text, was_translated = self.translation_service.translate_to_arabic(cleaned_text)
-            
-            # استخدام النص المترجم للتلخيص
-            final_text = translated_text
-            
-            is_valid, validation_message = self._validate_input(final_text)
+            # فحص النص المصدر قبل أي ترجمة حتى لا يُرسل نص مرفوض للمترجم أو يستهلك ميزانيته
+            is_valid, validation_message = self._validate_input(cleaned_text)
             
             if not is_valid:
                 return {
                     "success": False,
                     "error": validation_message,
                     "summary_ar": None,
-                    "was_translated": was_translated
+                    "was_translated": False
                 }
             
-            summary = None
-            method_used = "Unknown"
-            
-            # المحاولة 1: OpenAI GPT
-            if openai.api_key and openai.api_key.strip():
-                try:
-                    logger.info("محاولة التلخيص باستخدام OpenAI...")
-                    
-                    system_prompt = """أنت خبير في تلخيص النصوص الإخبارية باللغة العربية. 
-                    مهمتك هي قراءة النص المعطى وكتابة ملخص شامل ودقيق باللغة العربية الفصحى.
-
-                    متطلبات الملخص:
-                    1. يجب أن يكون باللغة العربية الفصحى
-                    2. يجب أن يغطي النقاط الرئيسية في النص
-                    3. يجب أن يكون واضحاً ومفهوماً
-                    4. يجب أن يتراوح طوله بين 150-300 كلمة
-                    5. يجب أن يحافظ على المعنى الأساسي للنص الأصلي
-                    6. تجنب التفاصيل الصغيرة والتركيز على الأهم
-                    7. اكتب بأسلوب صحفي واضح ومباشر
-                    8. استخدم جمل كاملة وتراكيب سليمة"""
-                    
-                    user_prompt = f"الرجاء تلخيص هذا النص باللغة العربية:\n\n{final_text}"
-                    
-                    response = openai.chat.completions.create(
-                        model="gpt-4",
-                        messages=[
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_prompt}
-                        ],
-                        max_tokens=400,
-                        temperature=0.7
-                    )
-                    
-                    summary = response.choices[0].message.content.strip()
-                    method_used = "OpenAI GPT-4"
-                    logger.info("تم التلخيص بنجاح باستخدام OpenAI")
-                    
-                except Exception as e:
-                    logger.error(f"فشل OpenAI: {e}")
-                    summary = None
-            
-            # إذا لم يتوفر OpenAI أو فشل، استخدم التلخيص البسيط
-            if not summary:
-                logger.info("استخدام التلخيص البسيط...")
-                summary = self._generate_simple_summary(final_text)
-                method_used = "Simple Summary Algorithm"
+            if pipeline == PIPELINE_SUMMARIZE_FIRST:
+                # التلخيص بلغة المصدر أولاً ثم ترجمة الملخص فقط
+                source_summary, method_used = self._summarize(cleaned_text, in_source_language=True)
+                summary, was_translated = self.translation_service.translate_to_arabic(source_summary)
+                translated_chars = len(source_summary) if was_translated else 0
+            else:
+                # الترجمة التلقائية إلى العربية إذا لزم الأمر
+                translated_text, was_translated = self.translation_service.translate_to_arabic(cleaned_text)
+                translated_chars = len(cleaned_text) if was_translated else 0
+                
+                # استخدام النص المترجم للتلخيص
+                final_text = translated_text
+                
+                is_valid, validation_message = self._validate_input(final_text)
+                
+                if not is_valid:
+                    return {
+                        "success": False,
+                        "error": validation_message,
+                        "summary_ar": None,
+                        "was_translated": was_translated
+                    }
+                
+                summary, method_used = self._summarize(final_text)
             
             return {
                 "success": True,
@@ -382,24 +528,287 @@ class AIService:
                 "summary_length": len(summary),
                 "method_used": method_used,
                 "was_translated": was_translated,
+                "pipeline": pipeline,
+                "translated_chars": translated_chars,
                 "timestamp": datetime.now().isoformat()
             }
             
+        except BudgetExceeded:
+            raise
+        except RequestTooLarge as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "summary_ar": None
+            }
         except Exception as e:
             logger.error(f"خطأ في التلخيص: {e}")
             return {
                 "success": False,
                 "error": f"خطأ في خدمة التلخيص: {str(e)}",
-                "summary_ar": None
+                "summary_ar": None,
+                # خطأ غير متوقع قد يكون مؤقتاً، بخلاف أخطاء التحقق من النص
+                "retryable": True
+            }
+
+class SummaryPrecomputer:
+    """تلخيص مقالات الصفحة الرئيسية مسبقاً في الخلفية عند تحديث الـ crawler"""
+    
+    STATUS_PENDING = 'pending'
+    STATUS_READY = 'ready'
+    STATUS_FAILED = 'failed'
+    
+    def __init__(self, service: AIService, workers: int = 2, pipeline: str = None):
+        self.service = service
+        self.pipeline = pipeline or DEFAULT_PIPELINE
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='precompute')
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        # يزيد مع كل تغيير في حالة الملخصات (يستخدم في ETag قائمة المقالات)
+        self.version = 0
+        self._lock = threading.Lock()
+    
+    def schedule(self, articles: List[Dict]):
+        """جدولة تلخيص المقالات الجديدة أو التي فشل تلخيصها بخطأ مؤقت وحان موعد إعادة محاولتها"""
+        links = {article.get('link') for article in articles if article.get('link')}
+        new_articles = []
+        now = time.monotonic()
+        
+        with self._lock:
+            # حذف ملخصات المقالات التي لم تعد في الصفحة الرئيسية
+            for link in list(self.entries):
+                if link not in links:
+                    del self.entries[link]
+            
+            for article in articles:
+                link = article.get('link')
+                entry = self.entries.get(link)
+                if not link or (entry and not self._should_retry(entry, now)):
+                    continue
+                attempt = entry['attempts'] + 1 if entry else 1
+                self.entries[link] = {"status": self.STATUS_PENDING}
+                new_articles.append((article, attempt))
+            
+            self.version += 1
+        
+        for article, attempt in new_articles:
+            self.executor.submit(self._summarize, article, attempt)
+        
+        if new_articles:
+            logger.info(f"جدولة تلخيص {len(new_articles)} مقال في الخلفية")
+    
+    def _should_retry(self, entry: Dict[str, Any], now: float) -> bool:
+        """إعادة المحاولة فقط للفشل المؤقت، بحد أقصى للمحاولات وبعد انتهاء التأخير"""
+        return (entry['status'] == self.STATUS_FAILED
+                and entry['retryable']
+                and entry['attempts'] < PRECOMPUTE_MAX_ATTEMPTS
+                and now >= entry['retry_at'])
+    
+    def _check_budget(self):
+        """عدم البدء إذا نزل رصيد أي ميزانية مشتركة عن الجزء المحجوز لطلبات المستخدمين"""
+        for budget in (translation_budget, openai_budget):
+            has_headroom, retry_after = budget.has_headroom(PRECOMPUTE_BUDGET_RESERVE)
+            if not has_headroom:
+                raise BudgetExceeded("الميزانية المتبقية محجوزة لطلبات المستخدمين", retry_after)
+    
+    def _summarize(self, article: Dict, attempt: int = 1):
+        """تلخيص مقال واحد وحفظ النتيجة"""
+        link = article['link']
+        retry_after = 0.0
+        try:
+            self._check_budget()
+            result = self.service.summarize_to_arabic(json.dumps(article), is_article_data=True, pipeline=self.pipeline)
+        except BudgetExceeded as e:
+            logger.info(f"تأجيل التلخيص المسبق للمقال {link}: {e}")
+            result = {"success": False, "error": str(e), "retryable": True}
+            retry_after = e.retry_after
+        except Exception as e:
+            logger.warning(f"فشل التلخيص المسبق للمقال {link}: {e}")
+            result = {"success": False, "error": str(e), "retryable": True}
+        
+        with self._lock:
+            # تجاهل النتيجة إذا خرج المقال من القائمة أثناء التلخيص
+            if link not in self.entries:
+                return
+            if result["success"]:
+                self.entries[link] = {"status": self.STATUS_READY, "result": result}
+            else:
+                backoff = PRECOMPUTE_RETRY_BACKOFF * 2 ** (attempt - 1)
+                self.entries[link] = {
+                    "status": self.STATUS_FAILED,
+                    "error": result.get("error"),
+                    "retryable": result.get("retryable", False),
+                    "attempts": attempt,
+                    "retry_at": time.monotonic() + max(backoff, retry_after)
+                }
+            self.version += 1
+    
+    def get_ready(self, link: str, pipeline: str) -> Optional[Dict[str, Any]]:
+        """إرجاع نتيجة التلخيص الجاهزة للمقال إن وجدت بنفس ترتيب المعالجة"""
+        if pipeline != self.pipeline:
+            return None
+        with self._lock:
+            entry = self.entries.get(link)
+        if entry and entry['status'] == self.STATUS_READY:
+            return entry['result']
+        return None
+    
+    def snapshot(self, links: List[str]) -> Dict[str, Any]:
+        """
+        حالات ملخصات المقالات مع الإصدار المطابق لها كلقطة واحدة
+        
+        Returns:
+            dict: statuses (الحالة لكل رابط)، version، و pending (هل ما زال أي ملخص قيد التنفيذ)
+        """
+        with self._lock:
+            entries = {link: self.entries.get(link) for link in links}
+            version = self.version
+        return {
+            "statuses": {link: self._public_status(entry) for link, entry in entries.items()},
+            "version": version,
+            "pending": any(entry and entry['status'] == self.STATUS_PENDING for entry in entries.values())
+        }
+    
+    def _public_status(self, entry: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """حالة الملخص المسبق للمقال بالشكل المرسل مع قائمة المقالات"""
+        if not entry:
+            return None
+        if entry['status'] == self.STATUS_READY:
+            result = entry['result']
+            return {
+                "status": self.STATUS_READY,
+                "summary_ar": result["summary_ar"],
+                "was_translated": result.get("was_translated", False),
+                "method_used": result.get("method_used"),
+                "timestamp": result.get("timestamp")
             }
+        if entry['status'] == self.STATUS_FAILED:
+            return {"status": self.STATUS_FAILED, "error": entry.get("error")}
+        return {"status": self.STATUS_PENDING}
 
 # إنشاء AI service instance
 ai_service = AIService()
 
+# ربط التلخيص المسبق بتحديثات الـ crawler
+summary_precomputer = SummaryPrecomputer(ai_service, workers=PRECOMPUTE_WORKERS) if PRECOMPUTE_SUMMARIES else None
+if summary_precomputer:
+    crawler.on_refresh = summary_precomputer.schedule
+
+def _is_trusted_proxy(address: Optional[str]) -> bool:
+    """هل الطلب قادم من proxy موثوق"""
+    if not TRUST_PROXY_HEADERS or not address:
+        return False
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+def _client_id() -> str:
+    """تحديد هوية العميل لحدود المعدل"""
+    if _is_trusted_proxy(request.remote_addr):
+        # X-Real-IP يضعه Nginx بنفسه، وآخر عنوان في X-Forwarded-For هو ما أضافه الـ proxy
+        forwarded = request.headers.get('X-Real-IP') or request.headers.get('X-Forwarded-For', '').split(',')[-1].strip()
+        if forwarded:
+            return forwarded
+    return request.remote_addr or 'unknown'
+
+def _reject(message: str, retry_after: float, status: int = 503):
+    """رفض سريع للطلب مع Retry-After"""
+    retry_after = max(1, math.ceil(retry_after))
+    response = jsonify({
+        "success": False,
+        "error": message,
+        "retry_after": retry_after
+    })
+    response.headers['Retry-After'] = str(retry_after)
+    return response, status
+
+def _negotiated_encoding() -> Optional[str]:
+    """الترميز الذي سيستلمه هذا الطلب حسب Accept-Encoding (brotli ثم gzip ثم بدون ضغط)"""
+    if brotli and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+def _variant_etag(etag: str) -> str:
+    """ETag النسخة التي سيستلمها هذا الطلب (مع لاحقة الترميز إن وجد)"""
+    encoding = _negotiated_encoding()
+    return f"{etag}-{encoding}" if encoding else etag
+
+def _not_modified(etag: str, cache_control: str):
+    """استجابة 304 بدون جسم تحمل نفس ETag و Vary للنسخة المختارة"""
+    response = app.response_class(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    response.vary.add('Accept-Encoding')
+    return response
+
+def _articles_etag(snapshot: Dict[str, Any], summaries_version: Optional[int]) -> str:
+    """ETag لقائمة المقالات من لقطة كاش الـ crawler وإصدار الملخصات المسبقة المقروء معها"""
+    version = "|".join([
+        str(snapshot["version"]),
+        snapshot["last_update"].isoformat() if snapshot["last_update"] else "",
+        str(summaries_version) if summaries_version is not None else "",
+        str(snapshot["cache_valid"])
+    ])
+    return "articles-" + hashlib.sha256(version.encode('utf-8')).hexdigest()[:32]
+
+@app.after_request
+def compress_response(response):
+    """ضغط استجابات JSON بـ brotli أو gzip حسب Accept-Encoding"""
+    if (response.status_code != 200 or response.direct_passthrough or
+            response.mimetype != 'application/json' or 'Content-Encoding' in response.headers):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    etag, weak = response.get_etag()
+    # الاستجابات ذات ETag تُضغط دائماً عند قبول العميل، حتى تطابق النسخة التي يتوقعها _variant_etag
+    if len(data) < COMPRESS_MIN_SIZE and not etag:
+        return response
+    
+    encoding = _negotiated_encoding()
+    if encoding == 'br':
+        compressed = brotli.compress(data, quality=5)
+    elif encoding == 'gzip':
+        compressed = gzip.compress(data, compresslevel=6, mtime=0)
+    else:
+        return response
+    
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    # ETag مختلف لكل ترميز حتى يبقى strong ETag صحيحاً
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
+
+def admission_control(rate_limiter: ClientRateLimiter, concurrency: ConcurrencyLimiter = None):
+    """
+    Decorator للتحكم في القبول: حد المعدل لكل عميل (429) ثم حد التزامن
+    وميزانيات الخدمات الخارجية (503)، كلاهما مع Retry-After
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            allowed, retry_after = rate_limiter.check(_client_id())
+            if not allowed:
+                return _reject("تم تجاوز الحد المسموح من الطلبات، يرجى المحاولة لاحقاً", retry_after, 429)
+            try:
+                if concurrency is None:
+                    return view(*args, **kwargs)
+                with concurrency:
+                    return view(*args, **kwargs)
+            except BudgetExceeded as e:
+                logger.warning(f"رفض طلب بسبب الحمل: {e}")
+                return _reject(str(e), e.retry_after)
+        return wrapper
+    return decorator
+
 @app.route('/')
 def health_check():
     """فحص حالة الخادم"""
-    return jsonify({
+    response = jsonify({
         "status": "running",
         "message": "Saudi Gazette Article Summarizer API with Auto Translation",
         "version": "2.0",
@@ -409,10 +818,18 @@ def health_check():
             "AI-Powered Summarization",
             "Enhanced UI"
         ],
+        "admission": {
+            "summarize_active": summarize_concurrency.active,
+            "summarize_rejected": summarize_concurrency.rejected,
+            "summarize_max_concurrency": SUMMARIZE_MAX_CONCURRENCY
+        },
         "timestamp": datetime.now().isoformat()
     })
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
 @app.route('/crawler/articles', methods=['GET'])
+@admission_control(articles_rate_limiter)
 def get_articles():
     """
     GET /crawler/articles
@@ -422,16 +839,37 @@ def get_articles():
         # فحص إذا كان المستخدم يريد إجبار التحديث
         force_refresh = request.args.get('force_refresh', 'false').lower() == 'true'
         
-        # جلب المقالات
-        articles = crawler.fetch_articles(force_refresh=force_refresh)
+        # جلب المقالات مع إصدار الكاش المطابق لها (لقطة واحدة)
+        snapshot = crawler.fetch_articles_snapshot(force_refresh=force_refresh)
+        articles = snapshot["articles"]
+        summaries = summary_precomputer.snapshot([a.get('link') for a in articles]) if summary_precomputer else None
         
-        return jsonify({
+        # إرجاع 304 إذا لم يتغير الكاش منذ آخر طلب للعميل (بدون إعادة بناء الاستجابة)
+        etag = _articles_etag(snapshot, summaries["version"] if summaries else None)
+        # لا تُخزن القائمة في الـ proxy ما دام هناك ملخص قيد التنفيذ حتى لا تثبت حالة pending
+        if force_refresh or (summaries and summaries["pending"]):
+            cache_control = 'no-cache'
+        else:
+            cache_control = f'public, max-age={ARTICLES_MAX_AGE}'
+        variant_etag = _variant_etag(etag)
+        if request.if_none_match.contains(variant_etag):
+            return _not_modified(variant_etag, cache_control)
+        
+        # إرفاق الملخص المحسوب مسبقاً (أو حالته) مع كل مقال
+        if summaries:
+            articles = [dict(article, summary=summaries["statuses"].get(article.get('link')))
+                        for article in articles]
+        
+        response = jsonify({
             "success": True,
             "articles": articles,
             "count": len(articles),
-            "last_update": crawler.last_update.isoformat() if crawler.last_update else None,
-            "cache_valid": crawler._is_cache_valid()
+            "last_update": snapshot["last_update"].isoformat() if snapshot["last_update"] else None,
+            "cache_valid": snapshot["cache_valid"]
         })
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = cache_control
+        return response
         
     except Exception as e:
         logger.error(f"خطأ في جلب المقالات: {e}")
@@ -442,12 +880,14 @@ def get_articles():
         }), 500
 
 @app.route('/articles/summarize', methods=['POST'])
+@admission_control(summarize_rate_limiter, summarize_concurrency)
 def summarize_article():
     """
     POST /articles/summarize
     تلخيص النص المرسل إلى العربية مع الترجمة التلقائية
     
     Request body: {"text": "النص المراد تلخيصه"} أو {"article": {article_data}}
+                  مع حقل اختياري "pipeline": "translate_first" أو "summarize_first"
     Response: {"summary_ar": "الملخص بالعربية", "was_translated": boolean}
     """
     try:
@@ -467,11 +907,25 @@ def summarize_article():
                 "error": "البيانات مفقودة"
             }), 400
         
+        # ترتيب المعالجة المطلوب (اختياري)
+        pipeline = data.get('pipeline') or DEFAULT_PIPELINE
+        if pipeline not in PIPELINE_MODES:
+            return jsonify({
+                "success": False,
+                "error": f"قيمة 'pipeline' غير صالحة. القيم المسموحة: {', '.join(PIPELINE_MODES)}"
+            }), 400
+        
         # التحقق من نوع البيانات
+        precomputed = False
         if 'article' in data:
             # تلخيص مقال محدد
             article_data = data['article']
-            result = ai_service.summarize_to_arabic(json.dumps(article_data), is_article_data=True)
+            # استخدام الملخص المحسوب مسبقاً إن كان جاهزاً
+            if summary_precomputer and isinstance(article_data, dict):
+                result = summary_precomputer.get_ready(article_data.get('link'), pipeline)
+                precomputed = result is not None
+            if not precomputed:
+                result = ai_service.summarize_to_arabic(json.dumps(article_data), is_article_data=True, pipeline=pipeline)
         elif 'text' in data:
             # تلخيص نص مخصص
             text = data.get('text', '').strip()
@@ -481,7 +935,7 @@ def summarize_article():
                     "error": "حقل 'text' مطلوب ولا يمكن أن يكون فارغاً"
                 }), 400
             
-            result = ai_service.summarize_to_arabic(text)
+            result = ai_service.summarize_to_arabic(text, pipeline=pipeline)
         else:
             return jsonify({
                 "success": False,
@@ -495,7 +949,7 @@ def summarize_article():
             }), 400
         
         # إرجاع الملخص
-        return jsonify({
+        response = jsonify({
             "success": True,
             "summary_ar": result["summary_ar"],
             "was_translated": result.get("was_translated", False),
@@ -503,10 +957,18 @@ def summarize_article():
                 "original_length": result.get("original_length"),
                 "summary_length": result.get("summary_length"),
                 "method_used": result.get("method_used"),
+                "pipeline": result.get("pipeline"),
+                "translated_chars": result.get("translated_chars"),
+                "precomputed": precomputed,
                 "timestamp": result.get("timestamp")
             }
         })
+        # استجابة POST لا تُخزن مؤقتاً (ولا تحمل ETag لأن metadata تتغير بين الطلبات)
+        response.headers['Cache-Control'] = 'no-store'
+        return response
         
+    except BudgetExceeded:
+        raise
     except Exception as e:
         logger.error(f"خطأ في endpoint التلخيص: {e}")
         return jsonify({
@@ -542,6 +1004,8 @@ if __name__ == '__main__':
     print("=" * 80)
     print("🔧 Environment variables (optional):")
     print("  OPENAI_API_KEY - للتلخيص المتقدم باستخدام GPT-4")
+    print("  SUMMARY_PIPELINE - translate_first (افتراضي) أو summarize_first")
+    print("  SAUDI_GAZETTE_URL / GOOGLE_TRANSLATE_URL / OPENAI_BASE_URL - عناوين بديلة للخدمات الخارجية")
     print("=" * 80)
     print("✨ NEW FEATURES:")
     print("  🌍 Auto Translation: English → Arabic")
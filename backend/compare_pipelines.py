@@ -0,0 +1,147 @@
+import argparse
+import json
+import re
+import time
+import logging
+from collections import Counter
+from typing import Dict, List, Optional
+
+from app import ai_service, crawler, PIPELINE_MODES, PIPELINE_TRANSLATE_FIRST
+
+# إعداد الـ logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+
+def _tokens(text: str) -> Counter:
+    """تقسيم النص إلى كلمات مع عدد تكرار كل كلمة"""
+    return Counter(re.findall(r'\w+', (text or '').lower()))
+
+
+def rouge1(summary: str, reference: str) -> Dict[str, float]:
+    """
+    ROUGE-1 بين ملخص ونص مرجعي
+
+    precision: نسبة كلمات الملخص الموجودة في المرجع (الالتزام بالمحتوى)
+    recall: نسبة كلمات المرجع التي يغطيها الملخص (التغطية)
+    """
+    summary_tokens, reference_tokens = _tokens(summary), _tokens(reference)
+    overlap = sum((summary_tokens & reference_tokens).values())
+    if not overlap:
+        return {"precision": 0.0, "recall": 0.0, "f1": 0.0}
+    precision = overlap / sum(summary_tokens.values())
+    recall = overlap / sum(reference_tokens.values())
+    return {
+        "precision": round(precision, 3),
+        "recall": round(recall, 3),
+        "f1": round(2 * precision * recall / (precision + recall), 3)
+    }
+
+
+def translated_reference(text: str, is_article_data: bool = False) -> Optional[str]:
+    """
+    النص المصدر كاملاً مترجماً إلى العربية، ويُستخدم مرجعاً لتقييم جودة الملخصات
+    (تُحسب هذه الترجمة مرة واحدة ولا تدخل في أرقام الزمن أو حجم الترجمة للأوضاع)
+    """
+    source = text
+    if is_article_data:
+        source = ai_service._extract_content_from_article_data(json.loads(text))
+        if not source:
+            return None
+    reference, _ = ai_service.translation_service.translate_to_arabic(ai_service._clean_text(source))
+    return reference
+
+
+def compare(text: str, is_article_data: bool = False) -> Dict[str, Dict]:
+    """
+    تشغيل جميع أوضاع المعالجة على نفس النص ومقارنة النتائج
+
+    Args:
+        text: النص أو JSON string لبيانات المقال
+        is_article_data: هل النص عبارة عن بيانات مقال
+
+    Returns:
+        dict: نتائج كل وضع (الزمن، حجم الترجمة، طول الملخص، ودرجات الجودة)
+    """
+    results = {}
+    for pipeline in PIPELINE_MODES:
+        started = time.perf_counter()
+        result = ai_service.summarize_to_arabic(text, is_article_data=is_article_data, pipeline=pipeline)
+        elapsed = time.perf_counter() - started
+        results[pipeline] = {
+            "success": result["success"],
+            "latency_s": round(elapsed, 3),
+            "translated_chars": result.get("translated_chars", 0),
+            "summary_length": result.get("summary_length", 0),
+            "method_used": result.get("method_used"),
+            "summary_ar": result.get("summary_ar"),
+            "error": result.get("error")
+        }
+
+    # الجودة: ROUGE-1 مقابل المصدر المترجم، و F1 مقابل ملخص translate_first كخط أساس
+    reference = translated_reference(text, is_article_data)
+    baseline = results[PIPELINE_TRANSLATE_FIRST]["summary_ar"] if results[PIPELINE_TRANSLATE_FIRST]["success"] else None
+    for r in results.values():
+        r["rouge1_vs_translated_source"] = rouge1(r["summary_ar"], reference) if r["success"] and reference else None
+        r["rouge1_f1_vs_translate_first"] = rouge1(r["summary_ar"], baseline)["f1"] if r["success"] and baseline else None
+    return results
+
+
+def _print_report(label: str, results: Dict[str, Dict]):
+    """طباعة مقارنة الأوضاع لنص واحد"""
+    print("=" * 80)
+    print(label[:80])
+    print("-" * 80)
+    for pipeline, r in results.items():
+        status = "OK" if r["success"] else f"FAIL ({r['error']})"
+        print(f"  {pipeline:<16} latency={r['latency_s']:>7.3f}s  "
+              f"translated_chars={r['translated_chars']:>6}  "
+              f"summary_length={r['summary_length']:>5}  {status}")
+        source_scores = r["rouge1_vs_translated_source"]
+        if source_scores:
+            print(f"  {'':<16} ROUGE-1 vs translated source: "
+                  f"P={source_scores['precision']:.3f} R={source_scores['recall']:.3f} F1={source_scores['f1']:.3f}  "
+                  f"ROUGE-1 F1 vs translate_first baseline: {r['rouge1_f1_vs_translate_first']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="مقارنة أوضاع التلخيص والترجمة (الجودة/الزمن/حجم الترجمة)")
+    parser.add_argument('--text-file', help="ملف نصي للتلخيص بدلاً من مقالات الموقع")
+    parser.add_argument('--limit', type=int, default=3, help="عدد مقالات الموقع المستخدمة في المقارنة")
+    parser.add_argument('--json', action='store_true', help="إخراج النتائج بصيغة JSON")
+    args = parser.parse_args()
+
+    samples: List[tuple] = []
+    if args.text_file:
+        with open(args.text_file, encoding='utf-8') as f:
+            samples.append((args.text_file, f.read(), False))
+    else:
+        # نفس crawler التطبيق حتى يُحترم SAUDI_GAZETTE_URL (مثلاً خوادم loadtest.py --fakes-only)
+        articles = crawler.fetch_articles()
+        for article in articles[:args.limit]:
+            samples.append((article['title'], json.dumps(article), True))
+
+    report = []
+    totals = {pipeline: {"latency_s": 0.0, "translated_chars": 0} for pipeline in PIPELINE_MODES}
+    for label, text, is_article_data in samples:
+        results = compare(text, is_article_data=is_article_data)
+        report.append({"label": label, "results": results})
+        for pipeline, r in results.items():
+            totals[pipeline]["latency_s"] += r["latency_s"]
+            totals[pipeline]["translated_chars"] += r["translated_chars"] or 0
+        if not args.json:
+            _print_report(label, results)
+
+    if args.json:
+        print(json.dumps({"samples": report, "totals": totals}, ensure_ascii=False, indent=2))
+        return
+
+    print("=" * 80)
+    print("الإجمالي:")
+    for pipeline, t in totals.items():
+        print(f"  {pipeline:<16} latency={t['latency_s']:>7.3f}s  translated_chars={t['translated_chars']:>7}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
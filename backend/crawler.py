@@ -2,26 +2,37 @@ import requests
 from bs4 import BeautifulSoup
 import json
 import time
+import threading
 from datetime import datetime, timedelta
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Any, Optional, Callable
+from urllib.parse import urlparse
 
 # إعداد الـ logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class SaudiGazetteCrawler:
-    def __init__(self, cache_ttl_hours: int = 1):
+    def __init__(self, cache_ttl_hours: int = 1, base_url: Optional[str] = None,
+                 on_refresh: Optional[Callable[[List[Dict]], None]] = None):
         """
         Saudi Gazette Crawler
         
         Args:
             cache_ttl_hours: عدد الساعات قبل تحديث الكاش
+            base_url: عنوان بديل للموقع (مثلاً خادم محلي لاختبارات الحمل)
+            on_refresh: دالة تُستدعى بقائمة المقالات بعد كل تحديث ناجح للكاش
         """
-        self.base_url = "https://saudigazette.com.sa/"
+        self.on_refresh = on_refresh
+        self.base_url = base_url or "https://saudigazette.com.sa/"
+        self.site_host = urlparse(self.base_url).netloc
         self.cache_ttl = timedelta(hours=cache_ttl_hours)
         self.articles_cache = []
         self.last_update = None
+        # يزيد مع كل تحديث للكاش (يستخدم في ETag)
+        self.cache_version = 0
+        # يحمي تحديث الكاش حتى تُقرأ المقالات وإصدارها كلقطة واحدة
+        self._lock = threading.Lock()
         
         # Headers لتجنب blocking
         self.headers = {
@@ -115,7 +126,7 @@ class SaudiGazetteCrawler:
                     
                     # فلترة وإضافة المقال
                     if (title and len(title) > 15 and len(title) < 150 and 
-                        link and 'saudigazette.com' in link and
+                        link and ('saudigazette.com' in link or self.site_host in link) and
                         title.lower() not in processed_titles):
                         
                         articles.append({
@@ -175,9 +186,12 @@ class SaudiGazetteCrawler:
             articles = self._extract_articles_from_html(response.text)
             
             if articles:
-                self.articles_cache = articles
-                self.last_update = datetime.now()
+                with self._lock:
+                    self.articles_cache = articles
+                    self.last_update = datetime.now()
+                    self.cache_version += 1
                 logger.info(f"تم جلب {len(articles)} مقال بنجاح")
+                self._notify_refresh(articles)
             else:
                 logger.warning("لم يتم العثور على مقالات")
                 # في حالة الفشل، نرجع الكاش القديم إذا كان موجود
@@ -198,6 +212,32 @@ class SaudiGazetteCrawler:
             logger.error(f"خطأ غير متوقع: {e}")
             return self.articles_cache if self.articles_cache else []
 
+    def fetch_articles_snapshot(self, force_refresh: bool = False) -> Dict[str, Any]:
+        """
+        جلب المقالات مع إصدار الكاش ووقت التحديث المطابقين لها
+        
+        تُقرأ القيم معاً تحت نفس الـ lock حتى لا يُنسب محتوى قديم لإصدار أحدث
+        إذا حدث تحديث متزامن (مثلاً force_refresh من عميل آخر)
+        """
+        self.fetch_articles(force_refresh)
+        with self._lock:
+            articles, version, last_update = self.articles_cache, self.cache_version, self.last_update
+        return {
+            "articles": articles,
+            "version": version,
+            "last_update": last_update,
+            "cache_valid": bool(last_update) and datetime.now() - last_update < self.cache_ttl
+        }
+
+    def _notify_refresh(self, articles: List[Dict]):
+        """إبلاغ المستمع بتحديث المقالات دون أن يؤثر فشله على الجلب"""
+        if not self.on_refresh:
+            return
+        try:
+            self.on_refresh(articles)
+        except Exception as e:
+            logger.error(f"خطأ في معالجة تحديث المقالات: {e}")
+
     def get_articles_json(self, force_refresh: bool = False) -> str:
         """إرجاع المقالات كـ JSON"""
         articles = self.fetch_articles(force_refresh)
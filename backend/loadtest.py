@@ -0,0 +1,443 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+import requests
+
+# إعداد الـ logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# نص إنجليزي ثابت لمحتوى المقالات الوهمية
+SAMPLE_SENTENCES = [
+    "The Saudi Ministry of Economy announced a new package of reforms aimed at supporting small businesses across the Kingdom",
+    "Officials said the measures would simplify licensing procedures and reduce the time needed to register a company",
+    "Analysts expect the changes to attract further foreign investment in line with the goals of Vision 2030",
+    "The announcement came during a press conference held in Riyadh on Monday morning",
+    "Several business leaders welcomed the decision and described it as an important step for the private sector",
+    "The ministry also revealed plans to launch a digital platform that connects entrepreneurs with potential investors",
+    "According to recent figures, the number of registered small enterprises has grown steadily over the past three years",
+    "Economists noted that the non-oil sector continues to expand at a faster pace than previously forecast",
+    "The reforms will be implemented in phases, starting with the major cities before reaching other regions",
+    "Authorities stressed that public feedback would be taken into account during the rollout of the new rules",
+]
+
+# كلمات عربية تستخدم لتوليد "ترجمة" وهمية بطول مقارب للنص الأصلي
+ARABIC_WORDS = ['أعلنت', 'الوزارة', 'عن', 'حزمة', 'جديدة', 'من', 'الإصلاحات', 'لدعم', 'المنشآت', 'الصغيرة',
+                'في', 'المملكة', 'وقال', 'المسؤولون', 'إن', 'الإجراءات', 'ستسهم', 'تبسيط', 'التراخيص', 'الاستثمار']
+
+
+class FakeUpstream:
+    """إعدادات خادم وهمي: زمن الاستجابة ونسبة الأخطاء المحقونة"""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0, error_status: int = 500):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """محاكاة زمن الاستجابة"""
+        latency = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if latency > 0:
+            time.sleep(latency / 1000.0)
+
+    def should_fail(self) -> bool:
+        """تحديد ما إذا كان يجب حقن خطأ في هذا الطلب"""
+        fail = random.random() < self.error_rate
+        with self._lock:
+            self.requests += 1
+            if fail:
+                self.errors += 1
+        return fail
+
+
+def _make_handler(upstream: FakeUpstream, routes):
+    """إنشاء handler يطبق زمن الاستجابة والأخطاء ثم يمرر الطلب للدالة المناسبة"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _respond(self, status: int, body: str, content_type: str):
+            payload = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _handle(self, method: str):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else b''
+            upstream.delay()
+            if upstream.should_fail():
+                self._respond(upstream.error_status, json.dumps({"error": "injected failure"}), 'application/json')
+                return
+            status, text, content_type = routes(method, urlparse(self.path), body, self.server.server_address)
+            self._respond(status, text, content_type)
+
+        def do_GET(self):
+            self._handle('GET')
+
+        def do_POST(self):
+            self._handle('POST')
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def _site_routes(article_count: int):
+    """صفحات موقع Saudi Gazette الوهمي: الصفحة الرئيسية وصفحات المقالات"""
+
+    def routes(method, url, body, address):
+        base = f"http://{address[0]}:{address[1]}"
+        match = re.match(r'^/article/(\d+)', url.path)
+        if match:
+            index = int(match.group(1))
+            sentences = [SAMPLE_SENTENCES[(index + i) % len(SAMPLE_SENTENCES)] for i in range(30)]
+            paragraphs = ''.join(f"<p>{escape(s)}.</p>" for s in sentences)
+            html = (f"<html><body><header>Saudi Gazette</header><article>"
+                    f"<h1>Article {index} - Economic reforms announced in Riyadh</h1>{paragraphs}"
+                    f"</article><footer>Footer</footer></body></html>")
+            return 200, html, 'text/html; charset=utf-8'
+        items = ''.join(
+            f'<article class="post"><h2><a href="{base}/article/{i}">'
+            f'Article {i} - Economic reforms announced in Riyadh</a></h2>'
+            f'<p>{escape(SAMPLE_SENTENCES[i % len(SAMPLE_SENTENCES)])}.</p></article>'
+            for i in range(1, article_count + 1)
+        )
+        return 200, f"<html><body>{items}</body></html>", 'text/html; charset=utf-8'
+
+    return routes
+
+
+def _fake_arabic(text: str) -> str:
+    """استبدال كل كلمة بكلمة عربية مع الحفاظ على علامات الترقيم وطول النص تقريباً"""
+    words = itertools.cycle(ARABIC_WORDS)
+    return re.sub(r'[^\W\d_]+', lambda m: next(words), text)
+
+
+def _translate_routes(method, url, body, address):
+    """واجهة Google Translate الوهمية بنفس صيغة HTML التي يقرأها deep-translator"""
+    text = parse_qs(url.query).get('q', [''])[0]
+    return 200, f'<html><body><div class="result-container">{escape(_fake_arabic(text))}</div></body></html>', 'text/html; charset=utf-8'
+
+
+def _openai_routes(method, url, body, address):
+    """واجهة OpenAI chat completions الوهمية"""
+    if method != 'POST' or not url.path.endswith('/chat/completions'):
+        return 404, json.dumps({"error": {"message": "not found"}}), 'application/json'
+    request_data = json.loads(body or b'{}')
+    messages = request_data.get('messages', [])
+    prompt = ' '.join(m.get('content', '') for m in messages)
+    content = ' '.join(prompt.split()[-200:])
+    # الموجه العربي يطلب ملخصاً بالعربية، والموجه الآخر يطلب ملخصاً بلغة المصدر
+    if messages and re.search(r'[\u0600-\u06FF]', messages[0].get('content', '')):
+        content = _fake_arabic(content)
+    return 200, json.dumps({
+        "id": "chatcmpl-loadtest",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request_data.get('model', 'gpt-4'),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                  "total_tokens": (len(prompt) + len(content)) // 4}
+    }, ensure_ascii=False), 'application/json'
+
+
+def start_fake_server(upstream: FakeUpstream, routes, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """تشغيل خادم وهمي في thread منفصل"""
+    server = ThreadingHTTPServer((host, port), _make_handler(upstream, routes))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _url(server: ThreadingHTTPServer, path: str = '/') -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}{path}"
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """حساب percentile بطريقة nearest-rank"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class LoadGenerator:
+    """توليد حمل بمعدل ثابت (open loop) على endpoints الخادم وجمع الإحصائيات"""
+
+    def __init__(self, target: str, rps: float, duration: float, summarize_ratio: float,
+                 force_refresh_ratio: float, pipeline: Optional[str], concurrency: int, timeout: float,
+                 clients: int = 1, late_ms: float = 10):
+        self.target = target.rstrip('/')
+        self.rps = rps
+        self.duration = duration
+        self.summarize_ratio = summarize_ratio
+        self.force_refresh_ratio = force_refresh_ratio
+        self.clients = clients
+        self.pipeline = pipeline
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.late_ms = late_ms
+        self.articles: List[Dict] = []
+        self.results: Dict[str, List[tuple]] = {'/crawler/articles': [], '/articles/summarize': []}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _send(self, endpoint: str, due: float, request):
+        """
+        إرسال طلب وتسجيل زمنه من موعده المجدول (وليس من لحظة بدء الـ thread)
+        حتى يظهر وقت الانتظار في طابور المولد ضمن الـ percentiles (تجنب coordinated omission)
+        """
+        sent = time.perf_counter()
+        try:
+            status = request().status_code
+        except requests.exceptions.RequestException:
+            status = None
+        finished = time.perf_counter()
+        with self._lock:
+            self.results[endpoint].append((finished - due, status, sent - due))
+
+    def _client_headers(self) -> Dict[str, str]:
+        """
+        محاكاة عدة عملاء عبر X-Real-IP حتى لا تطبق حدود العميل الواحد على كل الحمل
+        (يُحترم فقط إذا كان عنوان المولد ضمن TRUSTED_PROXIES في الخادم)
+        """
+        client = random.randrange(self.clients)
+        return {'X-Real-IP': f"10.{(client >> 16) & 255}.{(client >> 8) & 255}.{client & 255}"}
+
+    def _get_articles(self, due: float):
+        params = {'force_refresh': 'true'} if random.random() < self.force_refresh_ratio else None
+        self._send('/crawler/articles', due, lambda: self._session().get(
+            f"{self.target}/crawler/articles", params=params,
+            headers=self._client_headers(), timeout=self.timeout))
+
+    def _summarize(self, due: float):
+        payload = {"article": random.choice(self.articles)} if self.articles else {"text": ' '.join(SAMPLE_SENTENCES)}
+        if self.pipeline:
+            payload["pipeline"] = self.pipeline
+        self._send('/articles/summarize', due, lambda: self._session().post(
+            f"{self.target}/articles/summarize", json=payload,
+            headers=self._client_headers(), timeout=self.timeout))
+
+    def warm_up(self):
+        """جلب قائمة المقالات مرة واحدة لاستخدامها في طلبات التلخيص"""
+        response = requests.get(f"{self.target}/crawler/articles", timeout=self.timeout)
+        self.articles = response.json().get('articles', [])
+        logger.info(f"تم تحميل {len(self.articles)} مقال للاختبار")
+
+    def run(self) -> float:
+        """تشغيل الحمل وإرجاع الزمن الفعلي المستغرق"""
+        total = int(self.rps * self.duration)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for i in range(total):
+                # جدولة الطلبات بمعدل ثابت بغض النظر عن سرعة الاستجابة
+                due = started + i / self.rps
+                wait = due - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+                task = self._summarize if random.random() < self.summarize_ratio else self._get_articles
+                pool.submit(task, due)
+        return time.perf_counter() - started
+
+    def report(self, elapsed: float) -> Dict[str, Dict]:
+        """تلخيص النتائج لكل endpoint"""
+        report = {}
+        for endpoint, samples in self.results.items():
+            latencies = [latency * 1000 for latency, _, _ in samples]
+            send_delays = [delay * 1000 for _, _, delay in samples]
+            errors = sum(1 for _, status, _ in samples if status is None or status >= 400)
+            # الطلبات المرفوضة من التحكم في القبول (429/503)
+            shed = sum(1 for _, status, _ in samples if status in (429, 503))
+            # الطلبات التي لم تُرسل في موعدها لامتلاء --concurrency (المولد نفسه أصبح عنق الزجاجة)
+            late = sum(1 for delay in send_delays if delay > self.late_ms)
+            statuses: Dict[str, int] = {}
+            for _, status, _ in samples:
+                key = str(status) if status is not None else 'error'
+                statuses[key] = statuses.get(key, 0) + 1
+            report[endpoint] = {
+                "requests": len(samples),
+                "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+                "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+                "shed_rate": round(shed / len(samples), 4) if samples else 0.0,
+                "late_sends": late,
+                "late_rate": round(late / len(samples), 4) if samples else 0.0,
+                "send_delay_p99_ms": round(_percentile(send_delays, 99), 1),
+                "p50_ms": round(_percentile(latencies, 50), 1),
+                "p90_ms": round(_percentile(latencies, 90), 1),
+                "p99_ms": round(_percentile(latencies, 99), 1),
+                "max_ms": round(max(latencies), 1) if latencies else 0.0,
+                "statuses": statuses
+            }
+        return report
+
+
+def _wait_for(url: str, timeout: float = 30) -> bool:
+    """انتظار جاهزية الخادم"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=2).status_code == 200:
+                return True
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.3)
+    return False
+
+
+def _upstream(args, name: str, error_status: int) -> FakeUpstream:
+    """إعدادات خادم وهمي مع إمكانية تخصيص كل خدمة على حدة"""
+    latency = getattr(args, f'{name}_latency_ms')
+    error_rate = getattr(args, f'{name}_error_rate')
+    return FakeUpstream(
+        latency_ms=args.latency_ms if latency is None else latency,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate if error_rate is None else error_rate,
+        error_status=error_status
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="اختبار حمل بدون اتصال بالخدمات الخارجية (خوادم محلية بديلة)")
+    parser.add_argument('--rps', type=float, default=10, help="عدد الطلبات في الثانية")
+    parser.add_argument('--duration', type=float, default=30, help="مدة الاختبار بالثواني")
+    parser.add_argument('--summarize-ratio', type=float, default=0.5, help="نسبة طلبات التلخيص من إجمالي الطلبات")
+    parser.add_argument('--force-refresh-ratio', type=float, default=0.0, help="نسبة طلبات المقالات مع force_refresh")
+    parser.add_argument('--pipeline', choices=['translate_first', 'summarize_first'], help="ترتيب المعالجة في طلبات التلخيص")
+    parser.add_argument('--clients', type=int, default=100, help="عدد العملاء المحاكين (عناوين IP مختلفة)")
+    parser.add_argument('--concurrency', type=int, default=64, help="أقصى عدد طلبات متزامنة من المولد")
+    parser.add_argument('--late-ms', type=float, default=10,
+                        help="تأخر الإرسال عن الموعد المجدول الذي يُعد بعده الطلب متأخراً")
+    parser.add_argument('--timeout', type=float, default=60, help="مهلة كل طلب بالثواني")
+    parser.add_argument('--latency-ms', type=float, default=50, help="زمن استجابة الخوادم الوهمية")
+    parser.add_argument('--jitter-ms', type=float, default=20, help="تذبذب عشوائي يضاف لزمن الاستجابة")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="نسبة الأخطاء المحقونة في الخوادم الوهمية")
+    for name in ('site', 'translate', 'openai'):
+        parser.add_argument(f'--{name}-latency-ms', type=float, help=f"زمن استجابة خادم {name} (يتجاوز --latency-ms)")
+        parser.add_argument(f'--{name}-error-rate', type=float, help=f"نسبة أخطاء خادم {name} (يتجاوز --error-rate)")
+    parser.add_argument('--articles', type=int, default=8, help="عدد المقالات في الصفحة الرئيسية الوهمية")
+    parser.add_argument('--no-openai', action='store_true', help="تشغيل الخادم بدون OpenAI (التلخيص البسيط فقط)")
+    parser.add_argument('--target', help="عنوان خادم يعمل مسبقاً بدلاً من تشغيل app.py محلياً")
+    parser.add_argument('--app-port', type=int, default=5050, help="منفذ app.py عند تشغيله محلياً")
+    parser.add_argument('--fakes-only', action='store_true', help="تشغيل الخوادم الوهمية فقط وطباعة متغيرات البيئة")
+    parser.add_argument('--json', action='store_true', help="إخراج التقرير بصيغة JSON")
+    args = parser.parse_args()
+
+    site = _upstream(args, 'site', 500)
+    translate = _upstream(args, 'translate', 429)
+    openai_upstream = _upstream(args, 'openai', 429)
+
+    servers = {
+        'site': start_fake_server(site, _site_routes(args.articles)),
+        'translate': start_fake_server(translate, _translate_routes),
+        'openai': start_fake_server(openai_upstream, _openai_routes),
+    }
+    env = {
+        'SAUDI_GAZETTE_URL': _url(servers['site']),
+        'GOOGLE_TRANSLATE_URL': _url(servers['translate'], '/m'),
+        'OPENAI_BASE_URL': _url(servers['openai'], '/v1'),
+        'OPENAI_API_KEY': '' if args.no_openai else 'sk-loadtest',
+    }
+
+    if args.fakes_only:
+        print("الخوادم الوهمية تعمل. استخدم المتغيرات التالية لتشغيل الخادم:")
+        for key, value in env.items():
+            print(f"  export {key}={value}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            return
+
+    app_process = None
+    target = args.target
+    if not target:
+        target = f"http://127.0.0.1:{args.app_port}"
+        # المولد يعمل هنا كـ proxy موثوق حتى يُحترم X-Real-IP الذي يحاكي به عدة عملاء
+        app_env = dict(os.environ, **env, TRUST_PROXY_HEADERS='true', TRUSTED_PROXIES='127.0.0.1')
+        app_env.pop('FLASK_DEBUG', None)
+        app_process = subprocess.Popen(
+            [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--host', '127.0.0.1',
+             '--port', str(args.app_port), '--with-threads'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=app_env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        if not _wait_for(f"{target}/"):
+            app_process.terminate()
+            sys.exit("فشل تشغيل app.py")
+
+    try:
+        generator = LoadGenerator(target, args.rps, args.duration, args.summarize_ratio,
+                                  args.force_refresh_ratio, args.pipeline, args.concurrency, args.timeout,
+                                  clients=args.clients, late_ms=args.late_ms)
+        generator.warm_up()
+        logger.info(f"بدء الاختبار: {args.rps} طلب/ثانية لمدة {args.duration} ثانية على {target}")
+        elapsed = generator.run()
+        report = generator.report(elapsed)
+    finally:
+        if app_process:
+            app_process.terminate()
+            app_process.wait(timeout=10)
+
+    upstreams = {
+        name: {"requests": upstream.requests, "injected_errors": upstream.errors}
+        for name, upstream in (('site', site), ('translate', translate), ('openai', openai_upstream))
+    }
+
+    if args.json:
+        print(json.dumps({"elapsed_s": round(elapsed, 2), "endpoints": report, "upstreams": upstreams},
+                         ensure_ascii=False, indent=2))
+        return
+
+    print("=" * 80)
+    print(f"مدة الاختبار الفعلية: {elapsed:.2f} ثانية")
+    print("-" * 80)
+    for endpoint, r in report.items():
+        print(f"{endpoint}")
+        print(f"  requests={r['requests']}  throughput={r['throughput_rps']} rps  error_rate={r['error_rate']:.2%}  "
+              f"shed_rate={r['shed_rate']:.2%}")
+        print(f"  p50={r['p50_ms']}ms  p90={r['p90_ms']}ms  p99={r['p99_ms']}ms  max={r['max_ms']}ms")
+        print(f"  late_sends={r['late_sends']} ({r['late_rate']:.2%})  send_delay_p99={r['send_delay_p99_ms']}ms")
+        print(f"  statuses={r['statuses']}")
+    print("-" * 80)
+    for name, u in upstreams.items():
+        print(f"  upstream {name:<10} requests={u['requests']}  injected_errors={u['injected_errors']}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# إعداد الـ logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class BudgetExceeded(Exception):
+    """تجاوز ميزانية خدمة خارجية أو حد التزامن (يتحول إلى 503 مع Retry-After)"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RequestTooLarge(Exception):
+    """طلب أكبر من سعة الميزانية نفسها، لن يُقبل مهما انتظر (يتحول إلى 400)"""
+
+
+class TokenBucket:
+    """
+    Token bucket آمن للاستخدام من عدة threads
+
+    Args:
+        rate_per_minute: عدد الوحدات المضافة كل دقيقة (0 = بدون حد)
+        capacity: أقصى رصيد متاح دفعة واحدة (الافتراضي = rate_per_minute)
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, amount: float = 1) -> Tuple[bool, float]:
+        """
+        محاولة سحب وحدات من الرصيد بدون انتظار
+
+        Returns:
+            (نجاح العملية، عدد الثواني المقترح قبل إعادة المحاولة)
+
+        Raises:
+            RequestTooLarge: إذا كان المطلوب أكبر من سعة الـ bucket
+        """
+        if not self.enabled:
+            return True, 0.0
+        # الطلب الأكبر من السعة يُرفض مباشرة بدلاً من استنزاف الرصيد كاملاً على حساب الجميع
+        if amount > self.capacity:
+            raise RequestTooLarge(f"حجم الطلب ({int(amount)}) أكبر من الحد المسموح ({int(self.capacity)})")
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return True, 0.0
+            return False, (amount - self.tokens) / self.rate
+
+    def has_headroom(self, reserve_ratio: float) -> Tuple[bool, float]:
+        """
+        فحص بقاء رصيد أكبر من نسبة محجوزة من السعة دون سحب أي وحدات
+
+        Returns:
+            (هل الرصيد أعلى من المحجوز، عدد الثواني المقترح قبل إعادة المحاولة)
+        """
+        if not self.enabled:
+            return True, 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            reserved = self.capacity * reserve_ratio
+            if self.tokens >= reserved:
+                return True, 0.0
+            return False, (reserved - self.tokens) / self.rate
+
+
+class ClientRateLimiter:
+    """
+    حدود معدل الطلبات لكل عميل (دقيقة وساعة)
+
+    Args:
+        per_minute: عدد الطلبات المسموح بها في الدقيقة (0 = بدون حد)
+        per_hour: عدد الطلبات المسموح بها في الساعة (0 = بدون حد)
+    """
+
+    def __init__(self, per_minute: int, per_hour: int = 0, max_clients: int = 10000):
+        self.per_minute = per_minute
+        self.per_hour = per_hour
+        self.max_clients = max_clients
+        # مرتبة حسب آخر استخدام (LRU) لتحديد استهلاك الذاكرة
+        self.buckets: "OrderedDict[str, Tuple[TokenBucket, TokenBucket]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _buckets_for(self, client_id: str) -> Tuple[TokenBucket, TokenBucket]:
+        with self._lock:
+            buckets = self.buckets.get(client_id)
+            if buckets is None:
+                # حذف العميل الأقدم استخداماً عند امتلاء الجدول (O(1) بدلاً من فحص كل العملاء)
+                if len(self.buckets) >= self.max_clients:
+                    self.buckets.popitem(last=False)
+                buckets = (TokenBucket(self.per_minute), TokenBucket(self.per_hour / 60.0, self.per_hour))
+                self.buckets[client_id] = buckets
+            else:
+                self.buckets.move_to_end(client_id)
+            return buckets
+
+    def check(self, client_id: str) -> Tuple[bool, float]:
+        """فحص وتسجيل طلب جديد للعميل"""
+        minute, hour = self._buckets_for(client_id)
+        allowed, retry_after = minute.try_acquire()
+        if not allowed:
+            return False, retry_after
+        allowed, retry_after = hour.try_acquire()
+        if not allowed:
+            return False, retry_after
+        return True, 0.0
+
+
+class ConcurrencyLimiter:
+    """
+    حد أعلى لعدد الطلبات المتزامنة مع رفض سريع عند الامتلاء
+
+    Args:
+        max_concurrent: أقصى عدد طلبات تعمل في نفس الوقت (0 = بدون حد)
+        queue_timeout: أقصى وقت انتظار لمكان فارغ قبل الرفض (بالثواني)
+        retry_after: قيمة Retry-After المقترحة عند الرفض
+    """
+
+    def __init__(self, max_concurrent: int, queue_timeout: float = 0.0, retry_after: float = 1.0):
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._semaphore = threading.BoundedSemaphore(max_concurrent) if max_concurrent > 0 else None
+        self.active = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        if self._semaphore and not self._semaphore.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self.rejected += 1
+            raise BudgetExceeded("الخادم مشغول حالياً، يرجى المحاولة لاحقاً", self.retry_after)
+        with self._lock:
+            self.active += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        with self._lock:
+            self.active -= 1
+        if self._semaphore:
+            self._semaphore.release()
+        return False